@@ -0,0 +1,24 @@
+"""add plot_data_preview column to messages
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("plot_data_preview", sa.Text, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("messages", "plot_data_preview")
@@ -1,6 +1,6 @@
 """Context building — system prompts, data summary, and message assembly for the LLM."""
 
-import json
+from backend.app.utils import fastjson
 
 MAX_CONTEXT_ROWS = 5  # Max rows to replay in cross-turn context
 
@@ -56,6 +56,11 @@ Constraints:
 - If a query fails, examine the error, adjust, and retry. Don't give up on the first failure."""
 
 
+# Static text before/after the {data_summary} slot, split once at import
+_PROMPT_1_PREFIX, _PROMPT_1_SUFFIX = PROMPT_1.split("{data_summary}")
+_PROMPT_2_PREFIX, _PROMPT_2_SUFFIX = PROMPT_2.split("{data_summary}")
+
+
 def build_data_summary(
     row_count: int,
     col_count: int,
@@ -93,8 +98,9 @@ def build_data_summary(
 
 def get_system_prompt(is_initial_analysis: bool, data_summary: str) -> str:
     """Return the appropriate system prompt with data summary injected."""
-    template = PROMPT_1 if is_initial_analysis else PROMPT_2
-    return template.format(data_summary=data_summary)
+    if is_initial_analysis:
+        return _PROMPT_1_PREFIX + data_summary + _PROMPT_1_SUFFIX
+    return _PROMPT_2_PREFIX + data_summary + _PROMPT_2_SUFFIX
 
 
 def build_messages_for_llm(db_messages: list[dict]) -> list[dict]:
@@ -111,13 +117,14 @@ def build_messages_for_llm(db_messages: list[dict]) -> list[dict]:
         list of {"role": "user"|"assistant", "content": str} dicts
     """
     messages = []
+    append = messages.append  # Bound once — this loop runs over the full history every turn
     for msg in db_messages:
         role = msg["role"]
         msg_type = msg.get("type", "text")
         text = msg.get("text", "")
 
         if role == "user":
-            messages.append({"role": "user", "content": text})
+            append({"role": "user", "content": text})
 
         elif role == "assistant":
             if msg_type == "reasoning":
@@ -127,23 +134,25 @@ def build_messages_for_llm(db_messages: list[dict]) -> list[dict]:
                 plot_data = msg.get("plot_data")
                 if plot_data:
                     try:
-                        parsed = json.loads(plot_data) if isinstance(plot_data, str) else plot_data
+                        parsed = fastjson.loads(plot_data) if isinstance(plot_data, str) else plot_data
                         query = parsed.get("query", "")
                         columns = parsed.get("columns", [])
                         rows = parsed.get("rows", [])
+                        # Stored rows are capped at MAX_QUERY_ROWS — prefer the full count saved with them
+                        row_count = parsed.get("row_count", len(rows))
                         preview = rows[:MAX_CONTEXT_ROWS]
-                        content = f"[SQL query: {query}]\n[Result: {len(rows)} rows, columns: {columns}]\n{json.dumps(preview)}"
-                    except (json.JSONDecodeError, TypeError):
+                        content = f"[SQL query: {query}]\n[Result: {row_count} rows, columns: {columns}]\n{fastjson.dumps(preview)}"
+                    except (fastjson.JSONDecodeError, TypeError):
                         content = f"[Query result]: {text}"
                 else:
                     content = f"[Query result]: {text}"
-                messages.append({"role": "assistant", "content": content})
+                append({"role": "assistant", "content": content})
             elif msg_type in ("plot", "table"):
-                messages.append({
+                append({
                     "role": "assistant",
                     "content": f"[{msg_type.capitalize()} output]: {text}",
                 })
             else:
-                messages.append({"role": "assistant", "content": text})
+                append({"role": "assistant", "content": text})
 
     return messages
@@ -1,18 +1,19 @@
 """Agent graph — the core planner loop using Anthropic tool-use API."""
 
 import asyncio
-import json
+import functools
 import logging
 import time
 from typing import Any, Callable, Awaitable
 
 import anthropic
+import duckdb
 from sqlalchemy.orm import Session as DBSession
 
 logger = logging.getLogger("agent")
 
 from backend.app.agent.context import build_data_summary, get_system_prompt, build_messages_for_llm
-from backend.app.agent.persistence import save_reasoning, save_tool_message
+from backend.app.agent.persistence import query_result_preview, save_reasoning, save_tool_messages
 from backend.app.agent.tools import (
     create_duckdb_connection,
     execute_sql_query,
@@ -23,6 +24,8 @@ from backend.app.agent.tools import (
     SendEvent,
 )
 from backend.app.config import settings
+from backend.app.services.file_service import connect_duckdb
+from backend.app.utils import fastjson
 
 MAX_ITERATIONS = 15
 MODEL = "claude-sonnet-4-5-20250929"
@@ -128,6 +131,12 @@ TOOL_DEFINITIONS = [
 ]
 
 
+@functools.lru_cache(maxsize=1)
+def _get_client() -> anthropic.AsyncAnthropic:
+    """Return the process-wide Anthropic client, so HTTP connections are reused across turns."""
+    return anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+
+
 async def call_llm(
     client: anthropic.AsyncAnthropic,
     system_prompt: str,
@@ -251,6 +260,7 @@ async def run_agent(
     file_metadata: dict[str, Any] | None = None,
     db_messages: list[dict] | None = None,
     should_stop: bool = False,
+    conn: duckdb.DuckDBPyConnection | None = None,
 ) -> None:
     """Run the planner agent loop.
 
@@ -260,9 +270,12 @@ async def run_agent(
         is_initial_analysis: True for auto_analyze (Prompt 1), False for user questions (Prompt 2).
         send_event: Async callable to stream events to the frontend.
         db: SQLAlchemy database session.
-        file_metadata: Dict with row_count, col_count, column_types. Built from file if not provided.
+        file_metadata: Dict with row_count, col_count, column_types, and optionally a prebuilt
+            data_summary. Built from file if not provided.
         db_messages: Pre-loaded conversation history. Loaded from DB if not provided.
         should_stop: If True, skip execution and send done immediately.
+        conn: DuckDB connection with the `data` view, owned by the caller (the WebSocket keeps
+            one for its lifetime). A private one is opened and closed here if not provided.
     """
     logger.info(
         "=== Agent run started (session=%s, initial_analysis=%s) ===",
@@ -287,8 +300,8 @@ async def run_agent(
         file_metadata["row_count"], file_metadata["col_count"],
     )
 
-    # Build system prompt
-    data_summary = build_data_summary(
+    # Build system prompt — callers that keep file_metadata across turns pass a prebuilt summary
+    data_summary = file_metadata.get("data_summary") or build_data_summary(
         row_count=file_metadata["row_count"],
         col_count=file_metadata["col_count"],
         column_types=file_metadata["column_types"],
@@ -305,11 +318,13 @@ async def run_agent(
     if is_initial_analysis:
         llm_messages.append({"role": "user", "content": "Analyze this dataset."})
 
-    # Create Anthropic client
-    client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    client = _get_client()
 
-    # Create a shared DuckDB connection for the entire agent run
-    conn = await asyncio.to_thread(create_duckdb_connection, file_path)
+    # Use the caller's DuckDB connection, or open one for this run only
+    owns_conn = conn is None
+    if owns_conn:
+        conn = await asyncio.to_thread(create_duckdb_connection, file_path)
+    sql_semaphore = asyncio.Semaphore(settings.SQL_CONCURRENCY)
 
     logger.info("Conversation history: %d messages for LLM", len(llm_messages))
 
@@ -319,20 +334,27 @@ async def run_agent(
             logger.info("--- Iteration %d/%d ---", iteration + 1, MAX_ITERATIONS)
             response = await call_llm_streaming(client, system_prompt, llm_messages, TOOL_DEFINITIONS, send_event)
 
-            # Extract reasoning text and tool calls from response
+            # Single pass over the response: normalize SDK blocks to API dicts (replayed as the
+            # assistant turn) and split out reasoning text and tool calls
+            assistant_content = []
             reasoning_parts = []
-            tool_calls = []
+            parsed_calls = []
             for block in response.content:
                 if isinstance(block, dict):
-                    if block["type"] == "text":
-                        reasoning_parts.append(block["text"])
-                    elif block["type"] == "tool_use":
-                        tool_calls.append(block)
+                    block_type = block["type"]
                 else:
-                    if block.type == "text":
-                        reasoning_parts.append(block.text)
-                    elif block.type == "tool_use":
-                        tool_calls.append(block)
+                    block_type = block.type
+                    if block_type == "text":
+                        block = {"type": "text", "text": block.text}
+                    elif block_type == "tool_use":
+                        block = {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+                    else:
+                        continue
+                assistant_content.append(block)
+                if block_type == "text":
+                    reasoning_parts.append(block["text"])
+                elif block_type == "tool_use":
+                    parsed_calls.append((block["id"], block["name"], block["input"]))
 
             # Save reasoning if present
             reasoning_text = "\n".join(reasoning_parts).strip()
@@ -341,45 +363,42 @@ async def run_agent(
                 save_reasoning(db, session_id, reasoning_text)
 
             # No tool calls — agent is done (shouldn't happen normally, but safety net)
-            if not tool_calls:
+            if not parsed_calls:
                 logger.info("No tool calls returned — ending agent loop")
                 await send_event("done", {"data_updated": False})
                 return
 
-            # Parse tool call metadata
-            parsed_calls = []
-            for tc in tool_calls:
-                tool_name = tc["name"] if isinstance(tc, dict) else tc.name
-                tool_input = tc["input"] if isinstance(tc, dict) else tc.input
-                tool_id = tc["id"] if isinstance(tc, dict) else tc.id
-                parsed_calls.append((tool_id, tool_name, tool_input))
-
-            logger.info(
-                "Tool calls (%d): %s",
-                len(parsed_calls),
-                ", ".join(f"{name}(id={tid})" for tid, name, _ in parsed_calls),
-            )
-            for tid, name, inp in parsed_calls:
-                if name == "sql_query":
-                    logger.info("  sql_query: %s", inp.get("query", ""))
-                elif name == "output_text":
-                    preview = (inp.get("text") or "")[:120]
-                    logger.info("  output_text: %s...", preview)
-                elif name == "create_plot":
-                    logger.info("  create_plot: title=%s", inp.get("title"))
-                elif name == "output_table":
-                    logger.info("  output_table: title=%s, rows=%d", inp.get("title"), len(inp.get("rows", [])))
-                elif name == "finalize":
-                    logger.info("  finalize: session_title=%s", inp.get("session_title"))
+            # Per-call summary builds strings eagerly — skip it entirely when INFO is off
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Tool calls (%d): %s",
+                    len(parsed_calls),
+                    ", ".join(f"{name}(id={tid})" for tid, name, _ in parsed_calls),
+                )
+                for tid, name, inp in parsed_calls:
+                    if name == "sql_query":
+                        logger.info("  sql_query: %s", inp.get("query", ""))
+                    elif name == "output_text":
+                        preview = (inp.get("text") or "")[:120]
+                        logger.info("  output_text: %s...", preview)
+                    elif name == "create_plot":
+                        logger.info("  create_plot: title=%s", inp.get("title"))
+                    elif name == "output_table":
+                        logger.info("  output_table: title=%s, rows=%d", inp.get("title"), len(inp.get("rows", [])))
+                    elif name == "finalize":
+                        logger.info("  finalize: session_title=%s", inp.get("session_title"))
 
             # Send status events before executing
             for tool_id, tool_name, tool_input in parsed_calls:
                 if tool_name == "sql_query" and tool_input.get("description"):
                     await send_event("status", {"message": tool_input["description"]})
 
-            # Execute tool calls in parallel
+            # Execute tool calls in parallel — SQL queries are bounded by the semaphore
             async def _run_tool(tool_name: str, tool_input: dict) -> dict[str, Any]:
-                return await _execute_tool_core(
+                # A partial, not a coroutine: a task cancelled while waiting on the
+                # semaphore must not leave an un-awaited coroutine behind
+                call = functools.partial(
+                    _execute_tool_core,
                     tool_name=tool_name,
                     tool_input=tool_input,
                     file_path=file_path,
@@ -388,15 +407,24 @@ async def run_agent(
                     session_id=session_id,
                     conn=conn,
                 )
+                if tool_name != "sql_query":
+                    return await call()
+                async with sql_semaphore:
+                    return await call()
 
             t_tools = time.perf_counter()
-            results = await asyncio.gather(
-                *[_run_tool(name, inp) for _, name, inp in parsed_calls]
-            )
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [tg.create_task(_run_tool(name, inp)) for _, name, inp in parsed_calls]
+            except ExceptionGroup as eg:
+                # Siblings are already cancelled — surface the first failure as-is
+                raise eg.exceptions[0]
+            results = [task.result() for task in tasks]
             logger.info("All tools executed in %.2fs", time.perf_counter() - t_tools)
 
-            # Persist and build tool results in original order
+            # Persist (one batch per step) and build tool results in original order
             tool_results = []
+            records = []
             finalize_called = False
             for (tool_id, tool_name, tool_input), result in zip(parsed_calls, results):
                 if result.get("is_error"):
@@ -408,32 +436,20 @@ async def run_agent(
                     )
                 else:
                     logger.info("Tool %s result: ok=%s", tool_name, result.get("ok"))
-                _persist_tool_result(db, session_id, tool_name, tool_input, result)
+                record = _tool_record(tool_name, tool_input, result)
+                if record:
+                    records.append(record)
 
                 tool_results.append({
                     "type": "tool_result",
                     "tool_use_id": tool_id,
-                    "content": json.dumps(result),
+                    "content": fastjson.dumps(result),
                 })
                 if tool_name == "finalize":
                     finalize_called = True
+            save_tool_messages(db, session_id, records)
 
             # Append assistant message + tool results to conversation
-            assistant_content = []
-            for block in response.content:
-                if isinstance(block, dict):
-                    assistant_content.append(block)
-                else:
-                    if block.type == "text":
-                        assistant_content.append({"type": "text", "text": block.text})
-                    elif block.type == "tool_use":
-                        assistant_content.append({
-                            "type": "tool_use",
-                            "id": block.id,
-                            "name": block.name,
-                            "input": block.input,
-                        })
-
             llm_messages.append({"role": "assistant", "content": assistant_content})
             llm_messages.append({"role": "user", "content": tool_results})
 
@@ -445,7 +461,8 @@ async def run_agent(
         logger.warning("=== Agent run stopped: max iterations (%d) reached ===", MAX_ITERATIONS)
         await send_event("done", {"data_updated": False})
     finally:
-        conn.close()
+        if owns_conn:
+            conn.close()
 
 
 async def _execute_tool_core(
@@ -500,69 +517,66 @@ async def _execute_tool_core(
         return {"error": f"Unknown tool: {tool_name}"}
 
 
-def _persist_tool_result(
-    db: DBSession,
-    session_id: str,
+def _tool_record(
     tool_name: str,
     tool_input: dict,
     result: dict[str, Any],
-) -> None:
-    """Persist a tool result to the database. Called sequentially after parallel execution."""
+) -> dict[str, Any] | None:
+    """Build the message record for a tool result. Saved in one batch after parallel execution."""
     if tool_name == "sql_query":
-        save_tool_message(
-            db=db,
-            session_id=session_id,
-            tool_name="sql_query",
-            text=tool_input["description"],
-            plot_data=json.dumps({
-                "query": tool_input["query"],
-                "columns": result.get("columns", []),
-                "rows": result.get("rows", []),
-                "row_count": result.get("row_count", 0),
+        query = tool_input["query"]
+        columns = result.get("columns", [])
+        rows = result.get("rows", [])
+        row_count = result.get("row_count", 0)
+        return {
+            "tool_name": "sql_query",
+            "text": tool_input["description"],
+            "plot_data": fastjson.dumps({
+                "query": query,
+                "columns": columns,
+                "rows": rows,
+                "row_count": row_count,
             }),
-        )
+            # Built from the dict here so persistence never re-parses plot_data
+            "plot_data_preview": query_result_preview(query, columns, rows, row_count),
+        }
     elif tool_name == "output_text":
-        save_tool_message(
-            db=db,
-            session_id=session_id,
-            tool_name="output_text",
-            text=tool_input["text"],
-            plot_data=None,
-        )
+        return {
+            "tool_name": "output_text",
+            "text": tool_input["text"],
+            "plot_data": None,
+        }
     elif tool_name == "output_table":
-        save_tool_message(
-            db=db,
-            session_id=session_id,
-            tool_name="output_table",
-            text=tool_input["title"],
-            plot_data=json.dumps({
+        return {
+            "tool_name": "output_table",
+            "text": tool_input["title"],
+            "plot_data": fastjson.dumps({
                 "headers": tool_input["headers"],
                 "rows": tool_input["rows"],
             }),
-        )
+        }
     elif tool_name == "create_plot":
-        save_tool_message(
-            db=db,
-            session_id=session_id,
-            tool_name="create_plot",
-            text=tool_input["title"],
-            plot_data=json.dumps({
+        return {
+            "tool_name": "create_plot",
+            "text": tool_input["title"],
+            "plot_data": fastjson.dumps({
                 "title": tool_input["title"],
                 "plotly_spec": tool_input["plotly_spec"],
             }),
-        )
+        }
     # finalize doesn't need persistence — it updates session title inline
+    return None
 
 
 def _get_file_metadata(file_path: str) -> dict[str, Any]:
     """Extract metadata from the file using DuckDB."""
-    import duckdb, os
+    import os
 
     abs_path = os.path.abspath(file_path)
     ext = os.path.splitext(file_path)[1].lower()
     read_fn = f"read_csv_auto('{abs_path}')" if ext == ".csv" else f"read_parquet('{abs_path}')"
 
-    conn = duckdb.connect()
+    conn = connect_duckdb()
     try:
         row_count = conn.execute(f"SELECT COUNT(*) FROM {read_fn}").fetchone()[0]
         describe = conn.execute(f"DESCRIBE SELECT * FROM {read_fn}").fetchall()
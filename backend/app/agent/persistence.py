@@ -1,8 +1,11 @@
 """Message persistence helpers for the agent."""
 
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session as DBSession
 
+from backend.app.agent.context import MAX_CONTEXT_ROWS
 from backend.app.models.message import Message
+from backend.app.utils import fastjson
 
 # Map tool names to message types stored in the DB
 _TOOL_TYPE_MAP = {
@@ -13,26 +16,80 @@ _TOOL_TYPE_MAP = {
 }
 
 
-def save_user_message(db: DBSession, session_id: str, text: str) -> None:
-    msg = Message(
-        session_id=session_id,
-        role="user",
-        text=text,
-        type="text",
-    )
-    db.add(msg)
+def query_result_preview(query: str, columns: list, rows: list, row_count: int) -> str:
+    """Serialize a sql_query result truncated to the rows replayed in LLM context.
+
+    Stored once at save time so history rebuilds never re-parse full results.
+    """
+    return fastjson.dumps({
+        "query": query,
+        "columns": columns,
+        "rows": rows[:MAX_CONTEXT_ROWS],
+        "row_count": row_count,
+    })
+
+
+def _query_result_preview(plot_data: str | None) -> str | None:
+    """Build the preview from an already-serialized sql_query payload."""
+    if not plot_data:
+        return None
+    try:
+        parsed = fastjson.loads(plot_data)
+        rows = parsed.get("rows", [])
+        return query_result_preview(
+            parsed.get("query", ""),
+            parsed.get("columns", []),
+            rows,
+            parsed.get("row_count", len(rows)),
+        )
+    except (fastjson.JSONDecodeError, AttributeError, TypeError):
+        return None  # Context builder falls back to the full plot_data
+
+
+def _insert_messages(db: DBSession, rows: list[dict]) -> None:
+    """Insert message rows with a single executemany and commit — no ORM objects are built."""
+    db.execute(insert(Message), rows)
     db.commit()
 
 
+def _tool_row(
+    session_id: str,
+    tool_name: str,
+    text: str,
+    plot_data: str | None,
+    plot_data_preview: str | None = None,
+) -> dict:
+    msg_type = _TOOL_TYPE_MAP.get(tool_name, "text")
+    if msg_type != "query_result":
+        plot_data_preview = None
+    elif plot_data_preview is None:
+        plot_data_preview = _query_result_preview(plot_data)
+    return {
+        "session_id": session_id,
+        "role": "assistant",
+        "text": text,
+        "type": msg_type,
+        "plot_data": plot_data,
+        "plot_data_preview": plot_data_preview,
+    }
+
+
+def save_user_message(db: DBSession, session_id: str, text: str) -> None:
+    _insert_messages(db, [{
+        "session_id": session_id,
+        "role": "user",
+        "text": text,
+        "type": "text",
+    }])
+
+
 def save_reasoning(db: DBSession, session_id: str, text: str) -> None:
-    msg = Message(
-        session_id=session_id,
-        role="assistant",
-        text=text,
-        type="reasoning",
-    )
-    db.add(msg)
-    db.commit()
+    _insert_messages(db, [{
+        "session_id": session_id,
+        "role": "assistant",
+        "text": text,
+        "type": "reasoning",
+    }])
 
 
 def save_tool_message(
@@ -42,13 +99,53 @@ def save_tool_message(
     text: str,
     plot_data: str | None,
 ) -> None:
-    msg_type = _TOOL_TYPE_MAP.get(tool_name, "text")
-    msg = Message(
-        session_id=session_id,
-        role="assistant",
-        text=text,
-        type=msg_type,
-        plot_data=plot_data,
-    )
-    db.add(msg)
-    db.commit()
+    _insert_messages(db, [_tool_row(session_id, tool_name, text, plot_data)])
+
+
+def save_tool_messages(db: DBSession, session_id: str, records: list[dict]) -> None:
+    """Save several tool outputs with a single INSERT and commit.
+
+    Each record is a dict with keys: tool_name, text, plot_data, and optionally a prebuilt
+    plot_data_preview for sql_query results (otherwise it is derived from plot_data).
+    """
+    if not records:
+        return
+    _insert_messages(db, [
+        _tool_row(
+            session_id,
+            record["tool_name"],
+            record["text"],
+            record["plot_data"],
+            record.get("plot_data_preview"),
+        )
+        for record in records
+    ])
+
+
+def load_history(db: DBSession, session_id: str) -> list[dict]:
+    """Load conversation history from DB as plain dicts for the agent.
+
+    Selects only the columns the context builder reads, so rows come back as
+    plain tuples instead of fully hydrated Message objects. For query results
+    the truncated preview stands in for plot_data; older rows without one
+    fall back to the full payload.
+    """
+    rows = db.execute(
+        select(
+            Message.role,
+            Message.type,
+            Message.text,
+            func.coalesce(Message.plot_data_preview, Message.plot_data),
+        )
+        .where(Message.session_id == session_id)
+        .order_by(Message.created_at.asc())
+    ).all()
+    return [
+        {
+            "role": role,
+            "type": msg_type or "text",
+            "text": text,
+            "plot_data": plot_data,
+        }
+        for role, msg_type, text, plot_data in rows
+    ]
@@ -9,6 +9,11 @@ _BLOCKED_KEYWORDS = re.compile(
     re.IGNORECASE,
 )
 
+_STRING_LITERAL = re.compile(r"'[^']*'")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+_ALLOWED_FIRST_WORDS = frozenset({"SELECT", "WITH"})
+
 
 def validate_sql(query: str) -> None:
     """Validate that a SQL query is a read-only SELECT or WITH...SELECT.
@@ -22,7 +27,7 @@ def validate_sql(query: str) -> None:
 
     # Block multiple statements (semicolons)
     # Remove string literals first to avoid false positives on semicolons inside strings
-    no_strings = re.sub(r"'[^']*'", "", stripped)
+    no_strings = _STRING_LITERAL.sub("", stripped)
     if ";" in no_strings:
         raise ValueError("Multiple statements are not allowed")
 
@@ -31,10 +36,13 @@ def validate_sql(query: str) -> None:
     if match:
         raise ValueError(f"Statement type '{match.group().upper()}' is not allowed. Only SELECT queries are permitted.")
 
+    # Fast path: most queries start directly with SELECT/WITH, so no comment stripping is needed
+    if stripped.split(None, 1)[0].upper() in _ALLOWED_FIRST_WORDS:
+        return
+
     # Must start with SELECT or WITH (after stripping comments)
-    no_comments = re.sub(r"--[^\n]*", "", no_strings)
-    no_comments = re.sub(r"/\*.*?\*/", "", no_comments, flags=re.DOTALL)
+    no_comments = _COMMENT.sub(" ", no_strings)
     first_word = no_comments.strip().split()[0].upper() if no_comments.strip() else ""
 
-    if first_word not in ("SELECT", "WITH"):
+    if first_word not in _ALLOWED_FIRST_WORDS:
         raise ValueError(f"Statement type '{first_word}' is not allowed. Only SELECT queries are permitted.")
@@ -8,10 +8,12 @@ import time
 from typing import Any, Callable, Awaitable
 
 import duckdb
+from sqlalchemy import update
 from sqlalchemy.orm import Session as DBSession
 
 from backend.app.agent.sql_sanitizer import validate_sql
 from backend.app.models.session import Session
+from backend.app.services.file_service import connect_duckdb
 
 logger = logging.getLogger("agent.tools")
 
@@ -19,6 +21,10 @@ SendEvent = Callable[[str, dict], Awaitable[None]]
 
 MAX_QUERY_ROWS = 50
 MAX_PLOT_ROWS = 100
+_PLOT_DATA_KEYS = ("x", "y", "z", "values", "labels", "text", "customdata")
+
+# Exact types DuckDB returns that are already JSON-serializable — one hash lookup per cell
+_JSON_NATIVE_TYPES = frozenset({str, int, float, bool, type(None)})
 
 
 def create_duckdb_connection(file_path: str) -> duckdb.DuckDBPyConnection:
@@ -26,7 +32,7 @@ def create_duckdb_connection(file_path: str) -> duckdb.DuckDBPyConnection:
     abs_path = os.path.abspath(file_path)
     ext = os.path.splitext(file_path)[1].lower()
 
-    conn = duckdb.connect()
+    conn = connect_duckdb()
     if ext == ".csv":
         conn.execute(f"CREATE VIEW data AS SELECT * FROM read_csv_auto('{abs_path}')")
     elif ext in (".parquet", ".pq"):
@@ -34,6 +40,59 @@ def create_duckdb_connection(file_path: str) -> duckdb.DuckDBPyConnection:
     return conn
 
 
+def _sanitize_value(val: Any) -> Any:
+    """Return a JSON-safe cell value. Dates, decimals, UUIDs, etc. are stringified."""
+    if type(val) in _JSON_NATIVE_TYPES:
+        return val
+    if isinstance(val, (str, int, float, bool)):
+        return val
+    return str(val)
+
+
+def _even_indices(length: int) -> list[int] | None:
+    """MAX_PLOT_ROWS evenly spaced indices, first and last included. None if `length` already fits."""
+    if length <= MAX_PLOT_ROWS:
+        return None
+    return [i * (length - 1) // (MAX_PLOT_ROWS - 1) for i in range(MAX_PLOT_ROWS)]
+
+
+def _take(values: list, idx: list[int] | None) -> list:
+    if idx is None:
+        return values
+    return [values[i] for i in idx if i < len(values)]
+
+
+def _downsample_trace(trace: dict) -> None:
+    """Cap a trace's data arrays at MAX_PLOT_ROWS points, in place.
+
+    1-D traces share one index set taken from the longest array, so x/y/text pairs stay aligned.
+    Grid traces (2-D z: heatmap, contour, surface) are cut per axis — rows with y, columns with x.
+    """
+    arrays = {key: trace[key] for key in _PLOT_DATA_KEYS if isinstance(trace.get(key), list)}
+    z = arrays.get("z")
+    if z and isinstance(z[0], list):
+        n_rows = len(z)
+        n_cols = max((len(row) for row in z if isinstance(row, list)), default=0)
+        row_idx = _even_indices(n_rows)
+        col_idx = _even_indices(n_cols)
+        for key, values in arrays.items():
+            if values and isinstance(values[0], list):  # z/text/customdata grid
+                trace[key] = [
+                    _take(row, col_idx) if isinstance(row, list) else row
+                    for row in _take(values, row_idx)
+                ]
+            elif key == "x" and len(values) == n_cols:
+                trace[key] = _take(values, col_idx)
+            elif key == "y" and len(values) == n_rows:
+                trace[key] = _take(values, row_idx)
+        return
+
+    idx = _even_indices(max((len(values) for values in arrays.values()), default=0))
+    if idx is not None:
+        for key, values in arrays.items():
+            trace[key] = _take(values, idx)
+
+
 async def execute_sql_query(
     query: str,
     description: str,
@@ -69,16 +128,11 @@ async def execute_sql_query(
             wrapped = f"SELECT * FROM ({query}) _sub LIMIT {max_rows}"
             result = cursor.execute(wrapped)
             columns = [desc[0] for desc in result.description]
-            rows = [list(row) for row in result.fetchall()]
+            rows = [[_sanitize_value(val) for val in row] for row in result.fetchall()]
 
             count_result = cursor.execute(f"SELECT COUNT(*) FROM ({query}) _sub").fetchone()
             total_rows = count_result[0] if count_result else len(rows)
 
-            for row in rows:
-                for i, val in enumerate(row):
-                    if val is not None and not isinstance(val, (str, int, float, bool)):
-                        row[i] = str(val)
-
             return {
                 "columns": columns,
                 "rows": rows,
@@ -139,13 +193,11 @@ async def execute_create_plot(
     plotly_spec: dict,
     send_event: SendEvent,
 ) -> dict[str, Any]:
-    """Send a Plotly.js plot to the user. Truncates trace data to MAX_PLOT_ROWS."""
+    """Send a Plotly.js plot to the user. Downsamples trace data to at most MAX_PLOT_ROWS points."""
     logger.debug("execute_create_plot: title=%s", title)
     # Enforce row limit on each trace's data arrays
     for trace in plotly_spec.get("data", []):
-        for key in ("x", "y", "z", "values", "labels", "text", "customdata"):
-            if key in trace and isinstance(trace[key], list) and len(trace[key]) > MAX_PLOT_ROWS:
-                trace[key] = trace[key][:MAX_PLOT_ROWS]
+        _downsample_trace(trace)
 
     await send_event("plot", {
         "title": title,
@@ -164,10 +216,8 @@ async def execute_finalize(
     """End the current turn. Optionally set the session title."""
     logger.debug("execute_finalize: session_title=%s, suggestions=%s", session_title, suggestions)
     if session_title and db and session_id:
-        session = db.query(Session).filter(Session.id == session_id).first()
-        if session:
-            session.title = session_title
-            db.commit()
+        db.execute(update(Session).where(Session.id == session_id).values(title=session_title))
+        db.commit()
         await send_event("session_update", {"title": session_title})
 
     await send_event("done", {"data_updated": False, "suggestions": suggestions or []})
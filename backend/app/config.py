@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
@@ -8,6 +9,9 @@ class Settings(BaseSettings):
     ANTHROPIC_API_KEY: str = ""
     DATA_DIR: str = "data"
     MAX_UPLOAD_SIZE: int = 1_073_741_824  # 1 GB
+    SQL_CONCURRENCY: int = Field(default=4, gt=0)  # Max sql_query tool calls running at once per agent step
+    DUCKDB_MEMORY_LIMIT: str = ""  # e.g. "512MB"; empty keeps DuckDB's default (80% of RAM)
+    DUCKDB_THREADS: int = 0  # 0 keeps DuckDB's default (one per core)
 
     model_config = {
         "env_file": ".env",
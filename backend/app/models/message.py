@@ -21,6 +21,7 @@ class Message(Base):
     text: Mapped[str] = mapped_column(Text, nullable=False)
     type: Mapped[str | None] = mapped_column(String(50), nullable=True)
     plot_data: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON string
+    plot_data_preview: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON string — truncated query result for LLM context
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
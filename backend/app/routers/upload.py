@@ -1,4 +1,4 @@
-import json
+import os
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from sqlalchemy.orm import Session as DBSession
@@ -16,6 +16,7 @@ from backend.app.services.file_service import (
     validate_and_preview,
     cleanup_session_dir,
 )
+from backend.app.utils import fastjson
 
 router = APIRouter()
 
@@ -33,11 +34,12 @@ def upload_file(
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    # Read file content and check size
-    content = file.file.read()
-    if len(content) == 0:
+    # Check size without reading the whole upload into memory
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(0)
+    if size == 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is empty")
-    if len(content) > settings.MAX_UPLOAD_SIZE:
+    if size > settings.MAX_UPLOAD_SIZE:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File exceeds 1 GB size limit")
 
     # Create session
@@ -48,7 +50,7 @@ def upload_file(
 
     # Save file to disk
     try:
-        file_path = save_upload(session.id, filename, content)
+        file_path = save_upload(session.id, filename, file.file)
     except Exception as e:
         db.delete(session)
         db.commit()
@@ -70,8 +72,8 @@ def upload_file(
         path_on_disk=file_path,
         row_count=file_info["row_count"],
         col_count=file_info["column_count"],
-        columns=json.dumps(file_info["columns"]),
-        profile_data=json.dumps({
+        columns=fastjson.dumps(file_info["columns"]),
+        profile_data=fastjson.dumps({
             "column_types": file_info["column_types"],
             "column_profiles": file_info["column_profiles"],
         }),
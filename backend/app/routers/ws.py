@@ -4,15 +4,17 @@ import logging
 from functools import partial
 from typing import Any
 
+import duckdb
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 
 from backend.app.database import SessionLocal
 from backend.app.models.session import Session
 from backend.app.models.file import File
-from backend.app.models.message import Message
 from backend.app.utils.security import decode_access_token
+from backend.app.agent.context import build_data_summary
 from backend.app.agent.graph import run_agent
-from backend.app.agent.persistence import save_user_message
+from backend.app.agent.tools import create_duckdb_connection
+from backend.app.agent.persistence import load_history, save_user_message
 
 logger = logging.getLogger("agent.ws")
 
@@ -23,30 +25,12 @@ _active_tasks: dict[str, asyncio.Task] = {}
 
 
 async def send_event(ws: WebSocket, event: str, data: dict) -> None:
-    if event != "text_delta":  # text_delta is too noisy
+    # text_delta is too noisy; the guard also skips building the key list when DEBUG is off
+    if event != "text_delta" and logger.isEnabledFor(logging.DEBUG):
         logger.debug("WS send: event=%s data_keys=%s", event, list(data.keys()))
     await ws.send_json({"event": event, "data": data})
 
 
-def _load_db_messages(db, session_id: str) -> list[dict]:
-    """Load conversation history from DB as plain dicts for the agent."""
-    messages = (
-        db.query(Message)
-        .filter(Message.session_id == session_id)
-        .order_by(Message.created_at.asc())
-        .all()
-    )
-    return [
-        {
-            "role": msg.role,
-            "type": msg.type or "text",
-            "text": msg.text,
-            "plot_data": msg.plot_data,
-        }
-        for msg in messages
-    ]
-
-
 @router.websocket("/sessions/{session_id}/ws")
 async def websocket_chat(
     websocket: WebSocket,
@@ -86,7 +70,12 @@ async def websocket_chat(
     await websocket.accept()
     logger.info("WS connected: session=%s user=%s", session_id, user_id)
 
+    conn = None
     try:
+        # One DuckDB connection (and `data` view) per WebSocket, reused by every agent turn on it.
+        # Opened inside the try so an unreadable file is reported as error + done.
+        conn = await asyncio.to_thread(create_duckdb_connection, file_path)
+
         while True:
             raw = await websocket.receive_text()
 
@@ -102,9 +91,9 @@ async def websocket_chat(
 
             if msg_type == "message":
                 logger.info("User message: %s", data.get("text", "")[:200])
-                await handle_message(websocket, session_id, file_path, file_metadata, data.get("text", ""))
+                await handle_message(websocket, session_id, file_path, file_metadata, data.get("text", ""), conn)
             elif msg_type == "auto_analyze":
-                await handle_auto_analyze(websocket, session_id, file_path, file_metadata)
+                await handle_auto_analyze(websocket, session_id, file_path, file_metadata, conn)
             elif msg_type == "stop":
                 logger.info("User requested stop for session=%s", session_id)
                 await handle_stop(websocket, session_id)
@@ -124,14 +113,24 @@ async def websocket_chat(
             await send_event(websocket, "done", {"data_updated": False})
         except Exception:
             pass
+    finally:
+        if conn is not None:
+            conn.close()
 
 
-async def handle_message(ws: WebSocket, session_id: str, file_path: str, file_metadata: dict[str, Any], text: str) -> None:
+async def handle_message(
+    ws: WebSocket,
+    session_id: str,
+    file_path: str,
+    file_metadata: dict[str, Any],
+    text: str,
+    conn: duckdb.DuckDBPyConnection,
+) -> None:
     db = SessionLocal()
     try:
         save_user_message(db, session_id, text)
 
-        db_messages = _load_db_messages(db, session_id)
+        db_messages = load_history(db, session_id)
 
         _send = partial(send_event, ws)
 
@@ -144,6 +143,7 @@ async def handle_message(ws: WebSocket, session_id: str, file_path: str, file_me
                 db=db,
                 file_metadata=file_metadata,
                 db_messages=db_messages,
+                conn=conn,
             )
         )
         _active_tasks[session_id] = task
@@ -161,7 +161,13 @@ async def handle_message(ws: WebSocket, session_id: str, file_path: str, file_me
         db.close()
 
 
-async def handle_auto_analyze(ws: WebSocket, session_id: str, file_path: str, file_metadata: dict[str, Any]) -> None:
+async def handle_auto_analyze(
+    ws: WebSocket,
+    session_id: str,
+    file_path: str,
+    file_metadata: dict[str, Any],
+    conn: duckdb.DuckDBPyConnection,
+) -> None:
     db = SessionLocal()
     try:
         _send = partial(send_event, ws)
@@ -174,6 +180,7 @@ async def handle_auto_analyze(ws: WebSocket, session_id: str, file_path: str, fi
                 send_event=_send,
                 db=db,
                 file_metadata=file_metadata,
+                conn=conn,
             )
         )
         _active_tasks[session_id] = task
@@ -217,9 +224,17 @@ def _build_file_metadata(file_record: File) -> dict[str, Any]:
         except (json.JSONDecodeError, TypeError):
             pass
 
-    return {
+    metadata = {
         "row_count": file_record.row_count,
         "col_count": file_record.col_count,
         "column_types": column_types,
         "column_profiles": profile.get("column_profiles"),
     }
+    # Built once per connection and reused by every agent turn
+    metadata["data_summary"] = build_data_summary(
+        row_count=metadata["row_count"],
+        col_count=metadata["col_count"],
+        column_types=column_types,
+        column_profiles=metadata["column_profiles"],
+    )
+    return metadata
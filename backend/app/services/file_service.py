@@ -1,13 +1,24 @@
 import os
 import shutil
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
 import duckdb
 
 from backend.app.config import settings
 
 ALLOWED_EXTENSIONS = {".csv", ".parquet", ".pq"}
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB — bounds memory while copying uploads to disk
+
+
+def connect_duckdb() -> duckdb.DuckDBPyConnection:
+    """Open an in-memory DuckDB connection with the configured memory and thread limits."""
+    config: dict[str, Any] = {}
+    if settings.DUCKDB_MEMORY_LIMIT:
+        config["memory_limit"] = settings.DUCKDB_MEMORY_LIMIT
+    if settings.DUCKDB_THREADS:
+        config["threads"] = settings.DUCKDB_THREADS
+    return duckdb.connect(config=config)
 
 
 def get_file_extension(filename: str) -> str:
@@ -20,15 +31,15 @@ def validate_extension(filename: str) -> None:
         raise ValueError(f"Unsupported file format: {ext}. Allowed: .csv, .parquet, .pq")
 
 
-def save_upload(session_id: str, filename: str, content: bytes) -> str:
-    """Save uploaded file to data/{session_id}/original.{ext}. Returns path on disk."""
+def save_upload(session_id: str, filename: str, source: BinaryIO) -> str:
+    """Stream uploaded file to data/{session_id}/original.{ext} in chunks. Returns path on disk."""
     ext = get_file_extension(filename)
     session_dir = os.path.join(settings.DATA_DIR, session_id)
     os.makedirs(session_dir, exist_ok=True)
 
     file_path = os.path.join(session_dir, f"original{ext}")
     with open(file_path, "wb") as f:
-        f.write(content)
+        shutil.copyfileobj(source, f, UPLOAD_CHUNK_SIZE)
 
     return file_path
 
@@ -71,7 +82,7 @@ def validate_and_preview(file_path: str) -> dict[str, Any]:
     else:
         raise ValueError(f"Unsupported file format: {ext}")
 
-    conn = duckdb.connect()
+    conn = connect_duckdb()
     try:
         conn.execute(f"CREATE VIEW data AS SELECT * FROM {read_fn}")
 
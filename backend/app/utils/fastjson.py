@@ -0,0 +1,28 @@
+"""JSON helpers backed by orjson — same str-in/str-out shape as the stdlib json module."""
+
+import json
+from typing import Any
+
+import orjson
+
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError subclasses it
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj to compact JSON.
+
+    Falls back to stdlib json for values orjson rejects, e.g. integers wider
+    than 64 bits (DuckDB HUGEINT sums).
+    """
+    try:
+        return orjson.dumps(obj).decode()
+    except orjson.JSONEncodeError:
+        return json.dumps(obj, separators=(",", ":"))
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse JSON. Falls back to stdlib json for NaN/Infinity literals in older stored payloads."""
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
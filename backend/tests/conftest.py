@@ -1,14 +1,23 @@
 """Shared fixtures for agent tests."""
 
 import csv
-import os
-import tempfile
 import uuid
+from dataclasses import dataclass, field
+from typing import Any
 
+import duckdb
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
+try:
+    import uvloop  # Installed with uvicorn[standard] on non-Windows platforms
+except ImportError:
+    uvloop = None
+
+from backend.app.agent.tools import create_duckdb_connection
+from backend.app.config import settings
 from backend.app.database import Base
 from backend.app.models.user import User
 from backend.app.models.session import Session
@@ -16,14 +25,49 @@ from backend.app.models.file import File
 from backend.app.models.message import Message
 
 
-@pytest.fixture
-def db():
-    """In-memory SQLite database with all tables created."""
-    engine = create_engine("sqlite:///:memory:")
+if uvloop is not None:
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_asyncio_loop_factories(config, item):
+        """Run async tests on uvloop. Skipped where uvloop is missing (e.g. Windows)."""
+        return {"uvloop": uvloop.new_event_loop}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def duckdb_limits():
+    """Keep DuckDB's buffer manager and thread pool small for the test run."""
+    saved = settings.DUCKDB_MEMORY_LIMIT, settings.DUCKDB_THREADS
+    settings.DUCKDB_MEMORY_LIMIT, settings.DUCKDB_THREADS = "256MB", 2
+    yield
+    settings.DUCKDB_MEMORY_LIMIT, settings.DUCKDB_THREADS = saved
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """In-memory SQLite engine shared by the whole test session. Tables are created once.
+
+    StaticPool keeps the single in-memory connection alive and shareable across threads.
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
     Base.metadata.create_all(engine)
-    SessionLocal = sessionmaker(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    """Database session on the shared engine. All rows are deleted after each test."""
+    SessionLocal = sessionmaker(bind=db_engine)
     session = SessionLocal()
     yield session
+    session.rollback()
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
     session.close()
 
 
@@ -45,44 +89,70 @@ def sample_session(db, sample_user):
     return sess
 
 
-@pytest.fixture
-def sample_csv():
-    """Create a temporary CSV file and return its path. Cleaned up after test."""
-    tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, newline="")
-    writer = csv.writer(tmp)
-    writer.writerow(["id", "name", "age", "score"])
-    writer.writerow([1, "Alice", 30, 85.5])
-    writer.writerow([2, "Bob", 25, 92.0])
-    writer.writerow([3, "Charlie", 35, 78.3])
-    writer.writerow([4, "Diana", 28, None])
-    writer.writerow([5, "Eve", 22, 95.1])
-    tmp.close()
-    yield tmp.name
-    os.unlink(tmp.name)
-
-
-@pytest.fixture
-def large_csv():
-    """CSV with 200 rows for testing truncation."""
-    tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, newline="")
-    writer = csv.writer(tmp)
-    writer.writerow(["id", "value"])
-    for i in range(200):
-        writer.writerow([i, i * 10])
-    tmp.close()
-    yield tmp.name
-    os.unlink(tmp.name)
+@pytest.fixture(scope="session")
+def sample_csv(tmp_path_factory):
+    """Small CSV written once per test session. Tests must treat it as read-only."""
+    path = tmp_path_factory.mktemp("data") / "sample.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "age", "score"])
+        writer.writerow([1, "Alice", 30, 85.5])
+        writer.writerow([2, "Bob", 25, 92.0])
+        writer.writerow([3, "Charlie", 35, 78.3])
+        writer.writerow([4, "Diana", 28, None])
+        writer.writerow([5, "Eve", 22, 95.1])
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def large_csv(tmp_path_factory):
+    """CSV with 200 rows for testing truncation. Written once per test session."""
+    path = tmp_path_factory.mktemp("data") / "large.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "value"])
+        for i in range(200):
+            writer.writerow([i, i * 10])
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def sample_parquet(tmp_path_factory, sample_csv):
+    """sample_csv converted to Parquet with DuckDB. Exercises the read_parquet path."""
+    path = tmp_path_factory.mktemp("data") / "sample.parquet"
+    with duckdb.connect() as conn:
+        conn.execute(
+            f"COPY (SELECT * FROM read_csv_auto('{sample_csv}')) TO '{path}' (FORMAT PARQUET)"
+        )
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def sample_conn(sample_csv):
+    """DuckDB connection with the `data` view over sample_csv, shared by the session."""
+    conn = create_duckdb_connection(sample_csv)
+    yield conn
+    conn.close()
+
+
+@dataclass(slots=True)
+class CollectedEvents:
+    """WS events sent during a test, kept as parallel lists of event names and payloads."""
+
+    names: list[str] = field(default_factory=list)
+    datas: list[dict[str, Any]] = field(default_factory=list)
 
 
 @pytest.fixture
 def collected_events():
-    """List that collects WS events sent during a test. Used with mock_send_event."""
-    return []
+    """Collects WS events sent during a test. Used with mock_send_event."""
+    return CollectedEvents()
 
 
 @pytest.fixture
 def mock_send_event(collected_events):
     """Async callable that mimics send_event but just appends to collected_events."""
     async def _send(event: str, data: dict):
-        collected_events.append({"event": event, "data": data})
+        collected_events.names.append(event)
+        collected_events.datas.append(data)
     return _send
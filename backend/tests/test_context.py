@@ -138,10 +138,25 @@ class TestBuildMessagesForLLM:
         # Should only contain up to MAX_CONTEXT_ROWS (5) rows of data
         assert "50 rows" in assistant_msg["content"]
         assert "columns" in assistant_msg["content"]
-        # Count actual data rows in the JSON portion
-        import re
         # The truncated preview should have 5 rows
         content = assistant_msg["content"]
         json_part = content.split("\n")[-1]
         parsed_rows = json.loads(json_part)
         assert len(parsed_rows) == 5
+
+    def test_query_result_reports_stored_row_count(self):
+        db_messages = [
+            {
+                "role": "assistant",
+                "type": "query_result",
+                "text": "All rows",
+                "plot_data": json.dumps({
+                    "query": "SELECT * FROM data",
+                    "columns": ["id"],
+                    "rows": [[i] for i in range(50)],
+                    "row_count": 200,
+                }),
+            },
+        ]
+        result = build_messages_for_llm(db_messages)
+        assert "[Result: 200 rows" in result[0]["content"]
@@ -0,0 +1,27 @@
+"""Tests for the orjson-backed JSON helpers."""
+
+import pytest
+
+from backend.app.utils import fastjson
+
+
+class TestDumps:
+    def test_returns_compact_str(self):
+        assert fastjson.dumps({"a": [1, 2.5, None]}) == '{"a":[1,2.5,null]}'
+
+    def test_falls_back_for_wide_integers(self):
+        assert fastjson.dumps([2**70]) == f"[{2**70}]"
+
+
+class TestLoads:
+    def test_parses_str_and_bytes(self):
+        assert fastjson.loads('{"a": 1}') == {"a": 1}
+        assert fastjson.loads(b"[1, 2]") == [1, 2]
+
+    def test_accepts_nan_from_stdlib_payloads(self):
+        parsed = fastjson.loads('{"rows": [[NaN]]}')
+        assert parsed["rows"][0][0] != parsed["rows"][0][0]
+
+    def test_invalid_json_raises_decode_error(self):
+        with pytest.raises(fastjson.JSONDecodeError):
+            fastjson.loads("{not json")
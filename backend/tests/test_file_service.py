@@ -0,0 +1,19 @@
+"""Tests for upload storage in the file service."""
+
+import io
+
+from backend.app.config import settings
+from backend.app.services.file_service import UPLOAD_CHUNK_SIZE, save_upload
+
+
+class TestSaveUpload:
+    def test_streams_source_larger_than_chunk(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+        payload = bytes(range(256)) * (UPLOAD_CHUNK_SIZE // 256 * 2 + 3)
+        assert len(payload) > UPLOAD_CHUNK_SIZE * 2
+
+        path = save_upload("session-1", "Sales.CSV", io.BytesIO(payload))
+
+        assert path == str(tmp_path / "session-1" / "original.csv")
+        with open(path, "rb") as f:
+            assert f.read() == payload
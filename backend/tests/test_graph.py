@@ -1,11 +1,25 @@
 """Integration tests for the agent graph flow — mocked Anthropic API."""
 
+import asyncio
+import gc
 import json
-from unittest.mock import AsyncMock, patch, MagicMock
+import warnings
+from dataclasses import dataclass
+from types import SimpleNamespace
+from unittest.mock import patch
 
 import pytest
 
 from backend.app.agent.graph import run_agent
+from backend.app.agent.tools import create_duckdb_connection
+from backend.app.config import settings
+
+
+@dataclass(slots=True)
+class FakeResponse:
+    """Minimal stand-in for an Anthropic message — only the fields run_agent reads."""
+    content: list
+    stop_reason: str
 
 
 def make_tool_use_response(tool_calls, text_content=None):
@@ -26,18 +40,12 @@ def make_tool_use_response(tool_calls, text_content=None):
             "input": inp,
         })
 
-    response = MagicMock()
-    response.content = content
-    response.stop_reason = "tool_use"
-    return response
+    return FakeResponse(content=content, stop_reason="tool_use")
 
 
 def make_text_response(text):
     """Helper: build a mock Anthropic API response with text only (no tools)."""
-    response = MagicMock()
-    response.content = [{"type": "text", "text": text}]
-    response.stop_reason = "end_turn"
-    return response
+    return FakeResponse(content=[{"type": "text", "text": text}], stop_reason="end_turn")
 
 
 class TestAutoAnalyzeFlow:
@@ -96,7 +104,7 @@ class TestAutoAnalyzeFlow:
                 db=db,
             )
 
-        event_types = [e["event"] for e in collected_events]
+        event_types = collected_events.names
 
         # Should have: status (for queries), text, table, session_update, done
         assert "status" in event_types
@@ -147,7 +155,7 @@ class TestUserMessageFlow:
                 db=db,
             )
 
-        event_types = [e["event"] for e in collected_events]
+        event_types = collected_events.names
 
         assert "status" in event_types
         assert "text" in event_types
@@ -156,6 +164,125 @@ class TestUserMessageFlow:
         assert "session_update" not in event_types
 
 
+class TestCallerOwnedConnection:
+    """A DuckDB connection passed in by the caller is reused across runs and left open."""
+
+    @pytest.mark.asyncio
+    async def test_runs_share_connection_without_closing_it(
+        self, db, sample_session, sample_csv, mock_send_event, collected_events
+    ):
+        response = make_tool_use_response(
+            tool_calls=[
+                ("sql_query", {"query": "SELECT COUNT(*) AS cnt FROM data", "description": "Count rows"}),
+                ("finalize", {"session_title": None}),
+            ],
+        )
+
+        async def mock_create(*args, **kwargs):
+            return response
+
+        conn = create_duckdb_connection(sample_csv)
+        try:
+            with patch("backend.app.agent.graph.call_llm_streaming", side_effect=mock_create):
+                for _ in range(2):
+                    await run_agent(
+                        session_id=sample_session.id,
+                        file_path=sample_csv,
+                        is_initial_analysis=False,
+                        send_event=mock_send_event,
+                        db=db,
+                        conn=conn,
+                    )
+            assert collected_events.names.count("done") == 2
+            assert conn.execute("SELECT COUNT(*) FROM data").fetchone()[0] == 5
+        finally:
+            conn.close()
+
+
+class TestParallelToolExecution:
+    """Tool calls in one step run concurrently; sql_query calls are capped by SQL_CONCURRENCY."""
+
+    @pytest.mark.asyncio
+    async def test_sql_queries_respect_concurrency_cap(
+        self, db, sample_session, sample_csv, mock_send_event, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "SQL_CONCURRENCY", 2)
+        running = 0
+        peak = 0
+
+        async def fake_sql_query(**kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"is_error": False, "columns": [], "rows": [], "row_count": 0}
+
+        response = make_tool_use_response(
+            tool_calls=[
+                *[("sql_query", {"query": f"SELECT {i}", "description": f"Query {i}"}) for i in range(5)],
+                ("finalize", {"session_title": None}),
+            ],
+        )
+
+        async def mock_create(*args, **kwargs):
+            return response
+
+        with patch("backend.app.agent.graph.call_llm_streaming", side_effect=mock_create), \
+                patch("backend.app.agent.graph.execute_sql_query", side_effect=fake_sql_query):
+            await run_agent(
+                session_id=sample_session.id,
+                file_path=sample_csv,
+                is_initial_analysis=False,
+                send_event=mock_send_event,
+                db=db,
+            )
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_tool_failure_raises_original_exception(
+        self, db, sample_session, sample_csv, mock_send_event, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "SQL_CONCURRENCY", 1)
+
+        async def slow_sql_query(**kwargs):
+            await asyncio.sleep(0.05)
+            return {"is_error": False, "columns": [], "rows": [], "row_count": 0}
+
+        async def failing_output_text(**kwargs):
+            raise RuntimeError("boom")
+
+        response = make_tool_use_response(
+            tool_calls=[
+                ("sql_query", {"query": "SELECT 1", "description": "First"}),
+                ("sql_query", {"query": "SELECT 2", "description": "Waits on the semaphore"}),
+                ("output_text", {"text": "never sent"}),
+            ],
+        )
+
+        async def mock_create(*args, **kwargs):
+            return response
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with patch("backend.app.agent.graph.call_llm_streaming", side_effect=mock_create), \
+                    patch("backend.app.agent.graph.execute_sql_query", side_effect=slow_sql_query), \
+                    patch("backend.app.agent.graph.execute_output_text", side_effect=failing_output_text):
+                with pytest.raises(RuntimeError, match="boom"):
+                    await run_agent(
+                        session_id=sample_session.id,
+                        file_path=sample_csv,
+                        is_initial_analysis=False,
+                        send_event=mock_send_event,
+                        db=db,
+                    )
+            gc.collect()
+
+        # Cancelled SQL calls that were still waiting on the semaphore must not leak coroutines
+        assert not [w for w in caught if "never awaited" in str(w.message)]
+
+
 class TestErrorRecovery:
     """Agent retries when a SQL query fails."""
 
@@ -204,8 +331,11 @@ class TestErrorRecovery:
             )
 
         # Should have two status events for the two sql_query calls
-        status_events = [e for e in collected_events if e["event"] == "status"]
-        status_messages = [e["data"]["message"] for e in status_events]
+        status_messages = [
+            data["message"]
+            for name, data in zip(collected_events.names, collected_events.datas)
+            if name == "status"
+        ]
         assert "Get revenue" in status_messages
         assert "Average score" in status_messages
 
@@ -241,14 +371,14 @@ class TestStopCancellation:
                 should_stop=True,
             )
 
-        event_types = [e["event"] for e in collected_events]
+        event_types = collected_events.names
         assert "done" in event_types
         # Should not have entered the planner loop at all (or exited immediately)
         assert call_count == 0
 
 
 class TestParallelToolCalls:
-    """Agent returns multiple tool_use blocks — executed in parallel via asyncio.gather."""
+    """Agent returns multiple tool_use blocks — executed in parallel via asyncio.TaskGroup."""
 
     @pytest.mark.asyncio
     async def test_multiple_tools_in_one_step(
@@ -286,5 +416,59 @@ class TestParallelToolCalls:
                 db=db,
             )
 
-        status_events = [e for e in collected_events if e["event"] == "status" and e["data"]["message"] in ("Count rows", "Average age")]
+        status_events = [
+            data
+            for name, data in zip(collected_events.names, collected_events.datas)
+            if name == "status" and data["message"] in ("Count rows", "Average age")
+        ]
         assert len(status_events) == 2
+
+
+class TestSdkContentBlocks:
+    """SDK responses carry attribute-style blocks — they are replayed to the LLM as plain dicts."""
+
+    @pytest.mark.asyncio
+    async def test_object_blocks_normalized_for_replay(
+        self, db, sample_session, sample_csv, mock_send_event, collected_events
+    ):
+        response_1 = FakeResponse(
+            content=[
+                SimpleNamespace(type="text", text="Counting rows."),
+                SimpleNamespace(
+                    type="tool_use",
+                    id="call_sql",
+                    name="sql_query",
+                    input={"query": "SELECT COUNT(*) FROM data", "description": "Count rows"},
+                ),
+            ],
+            stop_reason="tool_use",
+        )
+        response_2 = make_tool_use_response(tool_calls=[("finalize", {"session_title": None})])
+
+        mock_responses = [response_1, response_2]
+        llm_calls = []
+
+        async def mock_create(*args, **kwargs):
+            llm_calls.append(list(args[2]))  # Snapshot of llm_messages at call time
+            return mock_responses[len(llm_calls) - 1]
+
+        with patch("backend.app.agent.graph.call_llm_streaming", side_effect=mock_create):
+            await run_agent(
+                session_id=sample_session.id,
+                file_path=sample_csv,
+                is_initial_analysis=False,
+                send_event=mock_send_event,
+                db=db,
+            )
+
+        assistant_turn = llm_calls[1][-2]
+        assert assistant_turn["role"] == "assistant"
+        assert assistant_turn["content"] == [
+            {"type": "text", "text": "Counting rows."},
+            {
+                "type": "tool_use",
+                "id": "call_sql",
+                "name": "sql_query",
+                "input": {"query": "SELECT COUNT(*) FROM data", "description": "Count rows"},
+            },
+        ]
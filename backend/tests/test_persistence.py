@@ -4,7 +4,13 @@ import json
 
 import pytest
 
-from backend.app.agent.persistence import save_tool_message, save_reasoning, save_user_message
+from backend.app.agent.persistence import (
+    load_history,
+    save_tool_message,
+    save_tool_messages,
+    save_reasoning,
+    save_user_message,
+)
 from backend.app.models.message import Message
 
 
@@ -81,6 +87,22 @@ class TestSaveToolMessage:
         parsed = json.loads(msg.plot_data)
         assert parsed["query"] == "SELECT AVG(score) FROM data"
 
+    def test_query_result_preview_truncated_at_save(self, db, sample_session):
+        rows = [[i, i * 10] for i in range(50)]
+        save_tool_message(
+            db=db,
+            session_id=sample_session.id,
+            tool_name="sql_query",
+            text="All rows",
+            plot_data=json.dumps({"query": "SELECT * FROM data", "columns": ["id", "value"], "rows": rows, "row_count": 50}),
+        )
+        msg = db.query(Message).filter(Message.session_id == sample_session.id).first()
+        assert len(json.loads(msg.plot_data)["rows"]) == 50
+        preview = json.loads(msg.plot_data_preview)
+        assert preview["rows"] == rows[:5]
+        assert preview["row_count"] == 50
+        assert preview["columns"] == ["id", "value"]
+
     def test_table_saved_with_type_table(self, db, sample_session):
         table_data = json.dumps({
             "headers": ["Column", "Type"],
@@ -98,3 +120,79 @@ class TestSaveToolMessage:
         assert msg.type == "table"
         parsed = json.loads(msg.plot_data)
         assert parsed["headers"] == ["Column", "Type"]
+
+
+class TestSaveToolMessages:
+    def test_saves_batch_with_mapped_types(self, db, sample_session):
+        save_tool_messages(db, sample_session.id, [
+            {"tool_name": "output_text", "text": "Scores are high.", "plot_data": None},
+            {"tool_name": "output_table", "text": "Summary", "plot_data": json.dumps({"headers": ["A"], "rows": [[1]]})},
+            {"tool_name": "create_plot", "text": "Chart", "plot_data": json.dumps({"title": "Chart", "plotly_spec": {}})},
+        ])
+        msgs = db.query(Message).filter(Message.session_id == sample_session.id).all()
+        assert sorted(m.type for m in msgs) == ["plot", "table", "text"]
+        assert all(m.role == "assistant" for m in msgs)
+        assert len({m.id for m in msgs}) == 3
+        assert all(m.created_at is not None for m in msgs)
+
+    def test_uses_prebuilt_query_result_preview(self, db, sample_session):
+        preview = json.dumps({"query": "SELECT 1", "columns": ["x"], "rows": [[1]], "row_count": 1})
+        save_tool_messages(db, sample_session.id, [{
+            "tool_name": "sql_query",
+            "text": "One",
+            "plot_data": "not parsed",
+            "plot_data_preview": preview,
+        }])
+        msg = db.query(Message).filter(Message.session_id == sample_session.id).one()
+        assert msg.plot_data_preview == preview
+
+    def test_empty_batch_is_noop(self, db, sample_session):
+        save_tool_messages(db, sample_session.id, [])
+        assert db.query(Message).count() == 0
+
+
+class TestLoadHistory:
+    def test_returns_plain_dicts_in_order(self, db, sample_session):
+        save_user_message(db, sample_session.id, "Show averages")
+        save_reasoning(db, sample_session.id, "I should query the averages.")
+        qr_data = json.dumps({"query": "SELECT AVG(score) FROM data", "columns": ["avg"], "rows": [[85.0]]})
+        save_tool_message(
+            db=db,
+            session_id=sample_session.id,
+            tool_name="sql_query",
+            text="Average score",
+            plot_data=qr_data,
+        )
+        history = load_history(db, sample_session.id)
+        assert [m["type"] for m in history] == ["text", "reasoning", "query_result"]
+        assert history[0] == {"role": "user", "type": "text", "text": "Show averages", "plot_data": None}
+        assert json.loads(history[2]["plot_data"])["rows"] == [[85.0]]
+
+    def test_query_result_replays_preview(self, db, sample_session):
+        rows = [[i] for i in range(50)]
+        save_tool_message(
+            db=db,
+            session_id=sample_session.id,
+            tool_name="sql_query",
+            text="All ids",
+            plot_data=json.dumps({"query": "SELECT id FROM data", "columns": ["id"], "rows": rows, "row_count": 200}),
+        )
+        parsed = json.loads(load_history(db, sample_session.id)[0]["plot_data"])
+        assert parsed["rows"] == rows[:5]
+        assert parsed["row_count"] == 200
+
+    def test_falls_back_to_plot_data_without_preview(self, db, sample_session):
+        qr_data = json.dumps({"query": "SELECT 1", "columns": ["x"], "rows": [[1]]})
+        db.add(Message(
+            session_id=sample_session.id,
+            role="assistant",
+            text="Legacy row",
+            type="query_result",
+            plot_data=qr_data,
+        ))
+        db.commit()
+        assert load_history(db, sample_session.id)[0]["plot_data"] == qr_data
+
+    def test_empty_for_unknown_session(self, db, sample_session):
+        save_user_message(db, sample_session.id, "Hello")
+        assert load_history(db, "no-such-session") == []
@@ -40,6 +40,12 @@ class TestAllowedQueries:
     def test_allows_case_insensitive_select(self):
         validate_sql("select * from data")
 
+    def test_allows_select_after_comment(self):
+        validate_sql("-- top scores\nSELECT * FROM data ORDER BY score DESC")
+
+    def test_allows_select_after_block_comment(self):
+        validate_sql("/* top scores */ SELECT * FROM data")
+
     def test_allows_select_with_join(self):
         validate_sql(
             "SELECT a.name, b.value FROM data a JOIN data b ON a.id = b.id"
@@ -75,6 +81,10 @@ class TestBlockedQueries:
         with pytest.raises(ValueError, match="(?i)not allowed"):
             validate_sql("SELECT * FROM data; DROP TABLE data")
 
+    def test_multiple_statements_reported_before_blocked_keyword(self):
+        with pytest.raises(ValueError, match="Multiple statements are not allowed"):
+            validate_sql("DROP TABLE x; SELECT 1")
+
     def test_blocks_dml_after_comment(self):
         with pytest.raises(ValueError, match="(?i)not allowed"):
             validate_sql("-- just a select\nDROP TABLE data")
@@ -91,6 +101,10 @@ class TestBlockedQueries:
         with pytest.raises(ValueError, match="(?i)not allowed"):
             validate_sql("ATTACH DATABASE '/tmp/evil.db' AS evil")
 
+    def test_blocks_non_select_statement(self):
+        with pytest.raises(ValueError, match="(?i)not allowed"):
+            validate_sql("SHOW TABLES")
+
     def test_blocks_empty_query(self):
         with pytest.raises(ValueError):
             validate_sql("")
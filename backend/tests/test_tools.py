@@ -3,7 +3,9 @@
 import json
 
 import pytest
+from sqlalchemy import select
 
+from backend.app.agent.persistence import save_tool_message
 from backend.app.agent.tools import (
     execute_sql_query,
     execute_output_text,
@@ -11,6 +13,7 @@ from backend.app.agent.tools import (
     execute_create_plot,
     execute_finalize,
 )
+from backend.app.models.message import Message
 
 
 # ---------------------------------------------------------------------------
@@ -42,11 +45,22 @@ class TestSqlQuery:
         assert result["row_count"] == 200
 
     @pytest.mark.asyncio
-    async def test_returns_result_metadata(self, sample_csv):
+    async def test_reads_parquet_file(self, sample_parquet):
+        result = await execute_sql_query(
+            query="SELECT name FROM data WHERE age > 25 ORDER BY id",
+            description="Adults over 25",
+            file_path=sample_parquet,
+        )
+        assert result["is_error"] is False
+        assert result["rows"] == [["Alice"], ["Charlie"], ["Diana"]]
+
+    @pytest.mark.asyncio
+    async def test_returns_result_metadata(self, sample_csv, sample_conn):
         result = await execute_sql_query(
             query="SELECT name FROM data WHERE age > 25",
             description="Adults over 25",
             file_path=sample_csv,
+            conn=sample_conn,
         )
         assert result["is_error"] is False
         assert "columns" in result
@@ -54,25 +68,41 @@ class TestSqlQuery:
         assert "row_count" in result
 
     @pytest.mark.asyncio
-    async def test_handles_duckdb_error(self, sample_csv):
+    async def test_stringifies_non_json_values(self, sample_csv, sample_conn):
+        result = await execute_sql_query(
+            query="SELECT DATE '2024-01-31' AS d, CAST(1.5 AS DECIMAL(4, 2)) AS dec, name FROM data LIMIT 1",
+            description="Mixed types",
+            file_path=sample_csv,
+            conn=sample_conn,
+        )
+        assert result["rows"][0] == ["2024-01-31", "1.50", "Alice"]
+
+    @pytest.mark.asyncio
+    async def test_handles_duckdb_error(self, sample_csv, sample_conn):
         result = await execute_sql_query(
             query="SELECT nonexistent_column FROM data",
             description="Bad query",
             file_path=sample_csv,
+            conn=sample_conn,
         )
         assert result["is_error"] is True
         assert "error" in result
 
     @pytest.mark.asyncio
-    async def test_rejects_blocked_sql(self, sample_csv):
+    async def test_rejects_blocked_sql(self, sample_csv, sample_conn):
         result = await execute_sql_query(
             query="DROP TABLE data",
             description="Evil query",
             file_path=sample_csv,
+            conn=sample_conn,
         )
         assert result["is_error"] is True
         assert "not allowed" in result["error"].lower()
 
+    def test_connection_uses_configured_limits(self, sample_conn):
+        threads = sample_conn.execute("SELECT current_setting('threads')").fetchone()[0]
+        assert threads == 2
+
 
 # ---------------------------------------------------------------------------
 # output_text
@@ -85,14 +115,11 @@ class TestOutputText:
             text="Here are the findings.",
             send_event=mock_send_event,
         )
-        assert len(collected_events) == 1
-        assert collected_events[0]["event"] == "text"
-        assert collected_events[0]["data"]["text"] == "Here are the findings."
+        assert collected_events.names == ["text"]
+        assert collected_events.datas[0]["text"] == "Here are the findings."
 
     @pytest.mark.asyncio
     async def test_saves_message_to_db(self, db, sample_session, mock_send_event):
-        from backend.app.agent.persistence import save_tool_message
-
         save_tool_message(
             db=db,
             session_id=sample_session.id,
@@ -100,12 +127,11 @@ class TestOutputText:
             text="Test message",
             plot_data=None,
         )
-        from backend.app.models.message import Message
-        msgs = db.query(Message).filter(Message.session_id == sample_session.id).all()
-        assert len(msgs) == 1
-        assert msgs[0].role == "assistant"
-        assert msgs[0].type == "text"
-        assert msgs[0].text == "Test message"
+        rows = db.execute(
+            select(Message.role, Message.type, Message.text)
+            .where(Message.session_id == sample_session.id)
+        ).all()
+        assert rows == [("assistant", "text", "Test message")]
 
 
 # ---------------------------------------------------------------------------
@@ -121,17 +147,14 @@ class TestOutputTable:
             rows=[["Alice", 85], ["Bob", 92]],
             send_event=mock_send_event,
         )
-        assert len(collected_events) == 1
-        evt = collected_events[0]
-        assert evt["event"] == "table"
-        assert evt["data"]["title"] == "Summary"
-        assert evt["data"]["headers"] == ["Name", "Score"]
-        assert len(evt["data"]["rows"]) == 2
+        assert collected_events.names == ["table"]
+        data = collected_events.datas[0]
+        assert data["title"] == "Summary"
+        assert data["headers"] == ["Name", "Score"]
+        assert len(data["rows"]) == 2
 
     @pytest.mark.asyncio
     async def test_saves_message_to_db(self, db, sample_session, mock_send_event):
-        from backend.app.agent.persistence import save_tool_message
-
         save_tool_message(
             db=db,
             session_id=sample_session.id,
@@ -139,10 +162,12 @@ class TestOutputTable:
             text="Summary",
             plot_data=json.dumps({"headers": ["A"], "rows": [[1]]}),
         )
-        from backend.app.models.message import Message
-        msg = db.query(Message).filter(Message.session_id == sample_session.id).first()
-        assert msg.type == "table"
-        assert json.loads(msg.plot_data)["headers"] == ["A"]
+        msg_type, plot_data = db.execute(
+            select(Message.type, Message.plot_data)
+            .where(Message.session_id == sample_session.id)
+        ).one()
+        assert msg_type == "table"
+        assert json.loads(plot_data)["headers"] == ["A"]
 
 
 # ---------------------------------------------------------------------------
@@ -161,11 +186,10 @@ class TestCreatePlot:
             plotly_spec=spec,
             send_event=mock_send_event,
         )
-        assert len(collected_events) == 1
-        evt = collected_events[0]
-        assert evt["event"] == "plot"
-        assert evt["data"]["title"] == "My Chart"
-        assert evt["data"]["plotly_spec"]["data"][0]["type"] == "bar"
+        assert collected_events.names == ["plot"]
+        data = collected_events.datas[0]
+        assert data["title"] == "My Chart"
+        assert data["plotly_spec"]["data"][0]["type"] == "bar"
     @pytest.mark.asyncio
     async def test_truncates_data_over_100_rows(self, mock_send_event, collected_events):
         big_x = list(range(200))
@@ -178,14 +202,65 @@ class TestCreatePlot:
             plotly_spec=spec,
             send_event=mock_send_event,
         )
-        sent_spec = collected_events[0]["data"]["plotly_spec"]
+        sent_spec = collected_events.datas[0]["plotly_spec"]
         assert len(sent_spec["data"][0]["x"]) <= 100
         assert len(sent_spec["data"][0]["y"]) <= 100
 
     @pytest.mark.asyncio
-    async def test_saves_message_to_db(self, db, sample_session, mock_send_event):
-        from backend.app.agent.persistence import save_tool_message
+    async def test_downsampling_keeps_full_range(self, mock_send_event, collected_events):
+        spec = {"data": [{"type": "scatter", "x": list(range(250)), "y": list(range(250))}]}
+        await execute_create_plot(
+            title="Long Series",
+            plotly_spec=spec,
+            send_event=mock_send_event,
+        )
+        trace = collected_events.datas[0]["plotly_spec"]["data"][0]
+        assert trace["x"] == trace["y"]
+        assert len(trace["x"]) == 100
+        assert trace["x"][0] == 0
+        assert trace["x"][-1] == 249
 
+    @pytest.mark.asyncio
+    async def test_downsampling_keeps_unequal_arrays_paired(self, mock_send_event, collected_events):
+        spec = {"data": [{
+            "type": "scatter",
+            "x": list(range(250)),
+            "text": [f"t{i}" for i in range(150)],
+        }]}
+        await execute_create_plot(
+            title="Labelled Series",
+            plotly_spec=spec,
+            send_event=mock_send_event,
+        )
+        trace = collected_events.datas[0]["plotly_spec"]["data"][0]
+        assert len(trace["x"]) == 100
+        assert 0 < len(trace["text"]) < 100
+        assert all(label == f"t{x}" for x, label in zip(trace["x"], trace["text"]))
+
+    @pytest.mark.asyncio
+    async def test_downsampling_heatmap_cuts_each_axis_separately(self, mock_send_event, collected_events):
+        # Wide grid: 10 rows x 200 columns, then tall grid: 150 rows x 20 columns
+        wide = {"type": "heatmap", "x": list(range(200)), "y": list(range(10)),
+                "z": [[r * 1000 + c for c in range(200)] for r in range(10)]}
+        tall = {"type": "heatmap", "x": list(range(20)), "y": list(range(150)),
+                "z": [[r * 1000 + c for c in range(20)] for r in range(150)]}
+        await execute_create_plot(
+            title="Heatmaps",
+            plotly_spec={"data": [wide, tall]},
+            send_event=mock_send_event,
+        )
+        wide_out, tall_out = collected_events.datas[0]["plotly_spec"]["data"]
+
+        assert len(wide_out["x"]) == 100
+        assert wide_out["y"] == list(range(10))
+        assert wide_out["z"] == [[r * 1000 + c for c in wide_out["x"]] for r in range(10)]
+
+        assert tall_out["x"] == list(range(20))
+        assert len(tall_out["y"]) == 100
+        assert tall_out["z"] == [[r * 1000 + c for c in range(20)] for r in tall_out["y"]]
+
+    @pytest.mark.asyncio
+    async def test_saves_message_to_db(self, db, sample_session, mock_send_event):
         spec = {"data": [{"type": "bar", "x": [], "y": []}], "layout": {}}
         save_tool_message(
             db=db,
@@ -194,10 +269,12 @@ class TestCreatePlot:
             text="My Chart",
             plot_data=json.dumps({"title": "My Chart", "plotly_spec": spec}),
         )
-        from backend.app.models.message import Message
-        msg = db.query(Message).filter(Message.session_id == sample_session.id).first()
-        assert msg.type == "plot"
-        parsed = json.loads(msg.plot_data)
+        msg_type, plot_data = db.execute(
+            select(Message.type, Message.plot_data)
+            .where(Message.session_id == sample_session.id)
+        ).one()
+        assert msg_type == "plot"
+        parsed = json.loads(plot_data)
         assert parsed["title"] == "My Chart"
 
 
@@ -212,9 +289,8 @@ class TestFinalize:
             session_title=None,
             send_event=mock_send_event,
         )
-        assert len(collected_events) == 1
-        assert collected_events[0]["event"] == "done"
-        assert collected_events[0]["data"]["data_updated"] is False
+        assert collected_events.names == ["done"]
+        assert collected_events.datas[0]["data_updated"] is False
 
     @pytest.mark.asyncio
     async def test_sets_session_title_when_provided(
@@ -227,14 +303,13 @@ class TestFinalize:
             session_id=sample_session.id,
         )
         # Should send session_update event before done
-        events = [e["event"] for e in collected_events]
+        events = collected_events.names
         assert "session_update" in events
         assert "done" in events
-        update_evt = next(e for e in collected_events if e["event"] == "session_update")
-        assert update_evt["data"]["title"] == "Sales Analysis Q4"
+        update_data = collected_events.datas[events.index("session_update")]
+        assert update_data["title"] == "Sales Analysis Q4"
 
         # DB should be updated
-        from backend.app.models.session import Session
         db.refresh(sample_session)
         assert sample_session.title == "Sales Analysis Q4"
 
@@ -244,6 +319,6 @@ class TestFinalize:
             session_title=None,
             send_event=mock_send_event,
         )
-        events = [e["event"] for e in collected_events]
+        events = collected_events.names
         assert "session_update" not in events
         assert "done" in events
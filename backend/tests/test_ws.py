@@ -0,0 +1,54 @@
+"""Tests for the chat WebSocket endpoint — driven with a fake WebSocket, no server."""
+
+import uuid
+
+import pytest
+from fastapi import WebSocketDisconnect
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.file import File
+from backend.app.routers import ws
+
+
+class FakeWebSocket:
+    """Records sent events. The client disconnects as soon as the server reads from it."""
+
+    def __init__(self):
+        self.sent = []
+        self.accepted = False
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def receive_text(self):
+        raise WebSocketDisconnect()
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+class TestWebsocketChat:
+    @pytest.mark.asyncio
+    async def test_reports_unreadable_file_as_error_and_done(
+        self, db, db_engine, sample_session, tmp_path, monkeypatch
+    ):
+        db.add(File(
+            id=str(uuid.uuid4()),
+            session_id=sample_session.id,
+            filename="gone.csv",
+            path_on_disk=str(tmp_path / "gone.csv"),
+            row_count=1,
+            col_count=1,
+        ))
+        db.commit()
+        monkeypatch.setattr(ws, "decode_access_token", lambda token: sample_session.user_id)
+        monkeypatch.setattr(ws, "SessionLocal", sessionmaker(bind=db_engine))
+
+        websocket = FakeWebSocket()
+        await ws.websocket_chat(websocket, sample_session.id, token="token")
+
+        assert websocket.accepted
+        assert [msg["event"] for msg in websocket.sent] == ["error", "done"]